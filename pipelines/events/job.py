@@ -8,11 +8,20 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import sqlite3
 
+from utils.csv_writer import write_csv
 from utils.geocode import add_lat_lng_for_column
 
-IGNORE_TITLES = {"UNISPORT HEALTH DAY", "Svakodnevno testiranje1"}
+# "Futsal studenti group 2" -> base "Futsal studenti", group "group 2"
+GROUP_SUFFIX = re.compile(r"^(?P<base>.*?)(?: (?P<group>group \d+))?$", re.IGNORECASE | re.DOTALL)
+
+# Indoor is the default (dvorana, bazen, teretana, klub, škola, or no keyword at all)
+OUTDOOR_LOCATION = re.compile(r"teren|žnjan", re.IGNORECASE)
+
+IGNORE_TITLES = frozenset({"UNISPORT HEALTH DAY", "Svakodnevno testiranje1"})
 
 TITLE_FIX = {
     "UNISPORT Scuba Diving school": "UNISPORT Scuba Diving School",
@@ -22,23 +31,39 @@ TITLE_FIX = {
     "Unisport S cuba Diving school": "UNISPORT Scuba Diving School",
 }
 
-EVENT_IS_WATER_SPORT = {"Swimming", "UNISPORT Scuba Diving School", "ROWfit"}
-EVENT_IS_PAIRED = {"SALSA/BACHATA"}
-EVENT_IS_TEAM = {"American football", "Futsal studenti", "Futsal studentice", "Košarka studenti/ce", "Lacrosse"}
-EVENT_IS_INDIVIDUAL = {
+_TITLE_FIX_FROM = pa.array(list(TITLE_FIX), type=pa.string())
+_TITLE_FIX_TO = pa.array(list(TITLE_FIX.values()), type=pa.string())
+
+EVENT_IS_WATER_SPORT = frozenset({"Swimming", "UNISPORT Scuba Diving School", "ROWfit"})
+EVENT_IS_PAIRED = frozenset({"SALSA/BACHATA"})
+EVENT_IS_TEAM = frozenset({"American football", "Futsal studenti", "Futsal studentice", "Košarka studenti/ce", "Lacrosse"})
+EVENT_IS_INDIVIDUAL = frozenset({
     "Functional training", "HRVANJE", "JIU JITSU", "JUDO", "Kickboxing",
     "ROWfit", "Run student run", "Sport climbing", "Swimming",
     "UNISPORT Scuba Diving School", "UniFIT",
-}
-EVENT_IS_CARDIO = {"Swimming", "ROWfit", "Run student run"}
-EVENT_IS_STRENGTH = {"Functional training", "UniFIT"}
-EVENT_IS_BALL_SPORT = {"American football", "Futsal studenti", "Futsal studentice", "Košarka studenti/ce", "Lacrosse"}
-EVENT_IS_COMBAT_SPORT = {"HRVANJE", "JUDO", "JIU JITSU", "Kickboxing"}
-EVENT_IS_CONTACT_SPORT = {
+})
+EVENT_IS_CARDIO = frozenset({"Swimming", "ROWfit", "Run student run"})
+EVENT_IS_STRENGTH = frozenset({"Functional training", "UniFIT"})
+EVENT_IS_BALL_SPORT = frozenset({"American football", "Futsal studenti", "Futsal studentice", "Košarka studenti/ce", "Lacrosse"})
+EVENT_IS_COMBAT_SPORT = frozenset({"HRVANJE", "JUDO", "JIU JITSU", "Kickboxing"})
+EVENT_IS_CONTACT_SPORT = frozenset({
     "American football", "Futsal studenti", "Futsal studentice", "Košarka studenti/ce", "Lacrosse",
     "HRVANJE", "JUDO", "JIU JITSU", "Kickboxing",
+})
+EVENT_IS_HIGH_INTENSITY = frozenset({"Kickboxing", "Functional training", "Sport climbing", "HRVANJE", "JUDO", "JIU JITSU"})
+
+FEATURE_SETS = {
+    "isWaterSport": EVENT_IS_WATER_SPORT,
+    "isPaired": EVENT_IS_PAIRED,
+    "isTeamSport": EVENT_IS_TEAM,
+    "isIndividual": EVENT_IS_INDIVIDUAL,
+    "isCardio": EVENT_IS_CARDIO,
+    "isStrength": EVENT_IS_STRENGTH,
+    "isBallSport": EVENT_IS_BALL_SPORT,
+    "isCombatSport": EVENT_IS_COMBAT_SPORT,
+    "isContactSport": EVENT_IS_CONTACT_SPORT,
+    "isHighIntensity": EVENT_IS_HIGH_INTENSITY,
 }
-EVENT_IS_HIGH_INTENSITY = {"Kickboxing", "Functional training", "Sport climbing", "HRVANJE", "JUDO", "JIU JITSU"}
 
 
 def _project_root() -> Path:
@@ -58,52 +83,46 @@ def _load_events(db_path: Path) -> pd.DataFrame:
     return df
 
 
-def _extract_group(title: str) -> tuple[str | None, str]:
-    match = re.search(r" (group \d+)$", title, re.IGNORECASE)
-    if match:
-        return match.group(1), title[: match.start()].strip()
-    return None, title
+def _clean_titles(titles: pd.Series) -> pd.Series:
+    """Strip " - subtitle" suffixes and apply TITLE_FIX in one chain of pyarrow compute kernels."""
+    arr = pc.utf8_trim_whitespace(pa.array(titles, type=pa.string()))
+    arr = pc.utf8_trim_whitespace(pc.replace_substring_regex(arr, pattern=r" -.*$", replacement=""))
+    fix = pc.index_in(arr, value_set=_TITLE_FIX_FROM)
+    arr = pc.if_else(pc.is_valid(fix), pc.take(_TITLE_FIX_TO, fix), arr)
+    return pd.Series(pd.array(arr, dtype="string[pyarrow]"), index=titles.index)
 
 
 def _add_indoor_from_location(df: pd.DataFrame) -> pd.DataFrame:
-    loc = df["location"].fillna("").str.lower()
-    indoor_keywords = r"dvorana|bazen|bazeni|teretana|klub|škola"
-    outdoor_keywords = r"teren|žnjan"
-    df["isIndoor"] = np.where(
-        loc.str.contains(outdoor_keywords, regex=True),
-        False,
-        np.where(loc.str.contains(indoor_keywords, regex=True), True, True),
-    )
-    df.loc[df["title"] == "ROWfit", "isIndoor"] = True
-    return df
+    """Events are indoor unless the location names an outdoor venue; ROWfit is always indoor."""
+    loc = df["location"].fillna("").to_numpy()
+    indoor = np.fromiter((not OUTDOOR_LOCATION.search(x) for x in loc), dtype=bool, count=len(loc))
+    return df.assign(isIndoor=indoor | (df["title"].to_numpy() == "ROWfit"))
 
 
 def _add_feature_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df["isWaterSport"] = df["title"].isin(EVENT_IS_WATER_SPORT)
-    df["isPaired"] = df["title"].isin(EVENT_IS_PAIRED)
-    df["isTeamSport"] = df["title"].isin(EVENT_IS_TEAM)
-    df["isIndividual"] = df["title"].isin(EVENT_IS_INDIVIDUAL)
-    df["isCardio"] = df["title"].isin(EVENT_IS_CARDIO)
-    df["isStrength"] = df["title"].isin(EVENT_IS_STRENGTH)
-    df["isBallSport"] = df["title"].isin(EVENT_IS_BALL_SPORT)
-    df["isCombatSport"] = df["title"].isin(EVENT_IS_COMBAT_SPORT)
-    df["isContactSport"] = df["title"].isin(EVENT_IS_CONTACT_SPORT)
-    df["isHighIntensity"] = df["title"].isin(EVENT_IS_HIGH_INTENSITY)
-    df["isInDormitory"] = df["location"].fillna("").str.contains(
+    """Set-membership flags per title. Titles are few, so classify each distinct title once and gather by code."""
+    codes, titles = pd.factorize(df["title"].to_numpy())
+    # One bit per feature set, one uint16 per distinct title. Extra zero entry at the end:
+    # missing titles get code -1 and land on it.
+    packed = np.zeros(len(titles) + 1, dtype=np.uint16)
+    for k, names in enumerate(FEATURE_SETS.values()):
+        packed[:-1] |= np.array([t in names for t in titles], dtype=np.uint16) << k
+    bits = packed[codes]
+    # Stage all new columns and insert them with a single assign.
+    new = {col: ((bits >> k) & 1).astype(bool) for k, col in enumerate(FEATURE_SETS)}
+    new["isInDormitory"] = df["location"].fillna("").str.contains(
         r"Dom|Kampus|studentski dom", case=False, regex=True
     )
-    return df
+    return df.assign(**new)
 
 
 def process_events(df: pd.DataFrame, *, skip_geocode: bool = False) -> pd.DataFrame:
-    df = df[~df["title"].isin(IGNORE_TITLES)].copy()
-
-    result = df["title"].apply(_extract_group)
-    df["group"] = result.apply(lambda x: x[0])
-    df["title"] = result.apply(lambda x: x[1])
+    # Arrow-backed strings: .str.replace/.str.contains below run as pyarrow compute kernels.
+    df = df.astype({"title": "string[pyarrow]", "location": "string[pyarrow]"})
+    df = df[~df["title"].isin(IGNORE_TITLES)]
 
-    df["title"] = df["title"].str.replace(r" -.*$", "", regex=True).str.strip()
-    df["title"] = df["title"].replace(TITLE_FIX)
+    ext = df["title"].str.extract(GROUP_SUFFIX)
+    df = df.assign(title=_clean_titles(ext["base"]), group=ext["group"])
 
     df = _add_indoor_from_location(df)
     df = _add_feature_columns(df)
@@ -133,7 +152,7 @@ def main() -> None:
 
     skip_geocode = os.environ.get("EVENTS_PIPELINE_SKIP_GEOCODE", "").lower() in ("1", "true", "yes")
     df = load_events(db_path, skip_geocode=skip_geocode)
-    df.to_csv(output_path, index=False)
+    write_csv(df, output_path)
     print(f"Output: {output_path} ({len(df)} events)")
 
 
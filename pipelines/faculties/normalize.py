@@ -2,6 +2,7 @@
 Shared faculty normalization used by faculties pipeline and map_faculties_to_people.
 """
 
+import functools
 import re
 
 # Only treat parenthetical suffix as city if it's a known Croatian city.
@@ -38,6 +39,9 @@ AMBIGUOUS_TO_CANONICAL = {
     "sveučilišni odjel za stručne studije": "Sveučilišni odjel za stručne studije (Split)",
     "prirodoslovno-matematički fakultet": "Prirodoslovno - matematički fakultet (Split)",
 }
+# Trailing location: "X (Split)" or "X, Split"
+PAREN_SUFFIX = re.compile(r"\s*\(([^)]+)\)\s*$")
+COMMA_SUFFIX = re.compile(r",\s*([^,]+)\s*$")
 SKIP_VALUES = {"", "Nema podataka.", "nan"}
 BEZ_PRAVNE_OSOBNOSTI = re.compile(r"\s+bez pravne osobnosti\s*", re.IGNORECASE)
 
@@ -60,13 +64,16 @@ def _apply_prelazak(s: str) -> str | None:
 
 def extract_location_suffix(s: str) -> tuple[str, str]:
     """Return (base_without_location, location_or_empty). Only treat (X) as city if X is in KNOWN_CITIES."""
-    m = re.search(r"\s*\(([^)]+)\)\s*$", s)
+    ends_with_paren = s.rstrip().endswith(")")
+    if not ends_with_paren and "," not in s:
+        return s, ""
+    m = PAREN_SUFFIX.search(s) if ends_with_paren else None
     if m:
         loc = m.group(1).strip()
         if loc in KNOWN_CITIES:
             return s[: m.start()].strip(), f" ({loc})"
         return s, ""
-    m2 = re.search(r",\s*([^,]+)\s*$", s)
+    m2 = COMMA_SUFFIX.search(s)
     if m2:
         loc = m2.group(1).strip()
         if loc in KNOWN_CITIES:
@@ -91,8 +98,9 @@ def _apply_odjel_mapping(s: str) -> str | None:
     return None
 
 
+@functools.lru_cache(maxsize=None)
 def clean_faculty(raw: str) -> str | None:
-    """Normalize raw faculty name to canonical form matching faculties.csv."""
+    """Normalize raw faculty name to canonical form matching faculties.csv. Memoized: pure function of raw."""
     s = _normalize_whitespace(raw)
     if not s or s in SKIP_VALUES:
         return None
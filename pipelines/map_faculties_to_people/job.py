@@ -26,10 +26,9 @@ def main() -> None:
         raise FileNotFoundError(f"Faculties not found: {faculties_path}")
 
     faculties_df = pd.read_csv(faculties_path)
-    faculty_to_city = {
-        row["faculty"]: (row["city"] if pd.notna(row["city"]) and str(row["city"]).strip() else "")
-        for _, row in faculties_df.iterrows()
-    }
+    city = faculties_df["city"]
+    cities = city.where(city.notna() & city.astype(str).str.strip().ne(""), "")
+    faculty_to_city = dict(zip(faculties_df["faculty"].to_numpy(), cities.to_numpy()))
 
     df = pd.read_csv(people_path)
     raw_faculty = df["faculty"].copy() if "faculty" in df.columns else pd.Series([""] * len(df))
@@ -43,16 +42,17 @@ def main() -> None:
             city = city_from_faculty_name(faculty)
         return faculty, str(city) if city else ""
 
-    resolved = raw_faculty.apply(lambda x: _resolve(x) if pd.notna(x) else ("", ""))
-    faculty_col = resolved.apply(lambda r: r[0])
-    city_col = resolved.apply(lambda r: r[1])
+    # Few distinct faculty strings across many people: normalize each once, then look up per row.
+    resolved_map = {raw: _resolve(raw) for raw in raw_faculty.dropna().unique()}
+    pairs = [resolved_map.get(x, ("", "")) if pd.notna(x) else ("", "") for x in raw_faculty]
+    resolved = pd.DataFrame(pairs, columns=["faculty", "faculty_city"], index=df.index)
 
     for col in ("faculty", "faculty_city"):
         if col in df.columns:
             df = df.drop(columns=[col])
 
-    df["faculty"] = faculty_col.values
-    df["faculty_city"] = city_col.fillna("").values
+    df["faculty"] = resolved["faculty"]
+    df["faculty_city"] = resolved["faculty_city"].fillna("")
 
     df.to_csv(people_path, index=False)
     print(f"Updated: {people_path}")
@@ -3,20 +3,27 @@ Geocode residence strings to lat/lng.
 Uses utils.geocode (Nominatim, data/cache/geocode_cache.json).
 """
 
+import numpy as np
 import pandas as pd
 
-from utils.geocode import build_query, geocode_address
+from utils.geocode import build_query, flush_cache, geocode_address
 
 
-def _address_and_country(row: pd.Series) -> tuple[str | None, str | None]:
-    """Return (address, country_code). Prefer residence; fallback to placeOfBirth with HR."""
-    r = row.get("residence")
-    if pd.notna(r) and str(r).strip():
-        return str(r).strip(), (row.get("country_code") or "").upper() or None
-    pob = row.get("placeOfBirth")
-    if pd.notna(pob) and str(pob).strip():
-        return str(pob).strip(), "HR"
-    return None, None
+def _stripped(s: pd.Series) -> pd.Series:
+    return s.where(s.notna(), "").astype(str).str.strip()
+
+
+def _vec_address_and_country(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return (address, country_code) arrays, one entry per row. Prefer residence; fallback to placeOfBirth with HR.
+    Rows without a usable address or country code get "".
+    """
+    residence = _stripped(df["residence"])
+    pob = _stripped(df["placeOfBirth"]) if "placeOfBirth" in df.columns else pd.Series("", index=df.index)
+    has_res = (residence != "").to_numpy()
+    addr = np.where(has_res, residence, pob)
+    cc = np.where(has_res, df["country_code"].fillna("").astype(str).str.upper(), np.where(pob != "", "HR", ""))
+    return addr, cc
 
 
 def geocode_lat_lng(
@@ -32,35 +39,21 @@ def add_lat_lng_to_df(df: pd.DataFrame, *, skip_api: bool = False) -> pd.DataFra
     Uses residence when available; falls back to placeOfBirth (with HR) when residence is empty.
     When skip_api=True, only uses cache; returns None for cache misses.
     """
-    unique_pairs = set()
-    for _, row in df.iterrows():
-        addr, cc = _address_and_country(row)
-        if addr and cc:
-            unique_pairs.add((addr, cc))
-
+    addr, cc = _vec_address_and_country(df)
+    pairs = list(zip(addr, cc))
     coords = {}
-    for addr, cc in unique_pairs:
-        key = build_query(addr, cc)
-        if key and key not in coords:
-            coords[key] = geocode_address(addr, cc, skip_api=skip_api, fallbacks=True)
-
-    def get_lat_lng(row):
-        addr, cc = _address_and_country(row)
-        if not addr or not cc:
-            return None, None
-        key = build_query(addr, cc)
-        return coords.get(key, (None, None))
-
-    def to_float(val):
-        if val is None:
-            return None
-        try:
-            return float(val)
-        except (ValueError, TypeError):
-            return None
-
-    lat_lng = df.apply(get_lat_lng, axis=1)
-    out = df.copy()
-    out["lat"] = lat_lng.apply(lambda x: to_float(x[0]))
-    out["lng"] = lat_lng.apply(lambda x: to_float(x[1]))
-    return out
+    by_query = {}
+    for a, c in dict.fromkeys(pairs):
+        key = build_query(a, c) if a and c else None
+        if not key:
+            continue
+        if key not in by_query:
+            by_query[key] = geocode_address(a, c, skip_api=skip_api, fallbacks=True)
+        coords[(a, c)] = by_query[key]
+    flush_cache()
+
+    lat_lng = np.array([coords.get(p, (None, None)) for p in pairs], dtype=object).reshape(-1, 2)
+    return df.assign(
+        lat=pd.to_numeric(lat_lng[:, 0], errors="coerce"),
+        lng=pd.to_numeric(lat_lng[:, 1], errors="coerce"),
+    )
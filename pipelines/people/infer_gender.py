@@ -3,6 +3,8 @@ Infer gender from Croatian first names.
 Uses gender-guesser (offline) with country='croatia' and explicit unisex list.
 """
 
+import functools
+
 import pandas as pd
 import gender_guesser.detector as gender
 
@@ -15,6 +17,16 @@ HR_UNISEX = frozenset({
 # Ženska imena – sigurno žensko kad inferiramo (preskače se ako postoji izvorni gender)
 HR_FEMALE = frozenset({"neri", "iris", "natali", "stefani"})
 
+# Sva unaprijed klasificirana imena u jednoj tablici (ključevi malim slovima); unisex ima prednost.
+_PRECLASSIFIED = {n: "female" for n in HR_FEMALE} | {n.lower(): "unisex" for n in HR_UNISEX}
+
+DETECTOR_TO_GENDER = {
+    "male": "male",
+    "mostly_male": "male",
+    "female": "female",
+    "mostly_female": "female",
+}
+
 _detector = None
 
 
@@ -25,6 +37,11 @@ def _get_detector():
     return _detector
 
 
+@functools.lru_cache(maxsize=None)
+def _detect(name: str) -> str:
+    return _get_detector().get_gender(name, "croatia")
+
+
 def infer_gender(first_name: str, existing_gender=None) -> str:
     """
     Vraća SAMO: male, female, unisex, unknown.
@@ -43,22 +60,13 @@ def infer_gender(first_name: str, existing_gender=None) -> str:
         return "unknown"
 
     normalized = name.strip()
-    if normalized in HR_UNISEX:
-        return "unisex"
-    if normalized.lower() in HR_FEMALE:
-        return "female"
-
-    d = _get_detector()
-    result = d.get_gender(normalized, "croatia")
+    pre = _PRECLASSIFIED.get(normalized.lower())
+    if pre:
+        return pre
 
-    mapping = {
-        "male": "male",
-        "mostly_male": "male",
-        "female": "female",
-        "mostly_female": "female",
-    }
-    if result in mapping:
-        return mapping[result]
+    result = _detect(normalized)
+    if result in DETECTOR_TO_GENDER:
+        return DETECTOR_TO_GENDER[result]
 
     # Fallback: gender-guesser vraća "andy"/"unknown" za mnoga hrvatska imena.
     # U hrvatskom: -a obično žensko, sve ostalo obično muško.
@@ -91,8 +99,12 @@ def add_gender_inferred(df: pd.DataFrame) -> pd.DataFrame:
     Output je UVIJEK male/female/unisex/unknown.
     """
     df = df.copy()
-    df["gender_inferred"] = df.apply(
-        lambda r: _normalize_gender(infer_gender(r.get("firstName"), r.get("gender"))),
-        axis=1,
-    )
+    # Isti (ime, spol) par daje isti rezultat – računa se jednom po paru.
+    cols = [
+        df[c].astype(object).where(df[c].notna(), None) if c in df.columns else [None] * len(df)
+        for c in ("firstName", "gender")
+    ]
+    keys = list(zip(*cols))
+    lookup = {k: _normalize_gender(infer_gender(*k)) for k in set(keys)}
+    df["gender_inferred"] = [lookup[k] for k in keys]
     return df
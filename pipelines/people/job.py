@@ -9,6 +9,7 @@ import sys
 import unicodedata
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 _root = Path(__file__).resolve().parent.parent.parent
@@ -18,10 +19,15 @@ if str(_root) not in sys.path:
 from pipelines.people.geocode_residence import add_lat_lng_to_df
 from pipelines.people.infer_gender import add_gender_inferred
 from pipelines.people.parse_dirty_socks import (
-    extract_country_code_and_address,
-    parse_dirty_socks,
-    to_iso_date,
+    SOCKS_KEYS,
+    extract_country_code_and_address_series,
+    parse_dirty_socks_row,
+    to_iso_date_series,
 )
+from utils.csv_writer import write_csv
+
+# Copy-on-write: slices and .assign share data until written, so the explicit .copy() calls are not needed
+pd.options.mode.copy_on_write = True
 
 SEP = " | "
 
@@ -48,6 +54,10 @@ OUTPUT_COLUMNS = [
 ]
 
 
+# Redaka po fetchu iz User tablice; vršna memorija ne ovisi o veličini tablice
+USERS_CHUNKSIZE = 50_000
+
+
 def _project_root() -> Path:
     return Path(__file__).resolve().parent.parent.parent
 
@@ -67,32 +77,69 @@ def _ensure_dirs() -> None:
 
 
 def _load_users(db_path: Path) -> pd.DataFrame:
+    """User rows without DROP_COLUMNS and IGNORE_PEOPLE; both filters run in SQLite."""
     conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query('SELECT * FROM "User"', conn)
+    columns = [
+        row[1]
+        for row in conn.execute('PRAGMA table_info("User")')
+        if row[1] not in DROP_COLUMNS
+    ]
+    select = ", ".join(f'"{c}"' for c in columns)
+    trimmed = "COALESCE(TRIM({}, ' ' || char(9, 10, 13)), '')"
+    where = ""
+    params: list[str] = []
+    if IGNORE_PEOPLE:
+        placeholders = ", ".join(["(?, ?)"] * len(IGNORE_PEOPLE))
+        where = (
+            f"WHERE ({trimmed.format('firstName')}, {trimmed.format('lastName')})"
+            f" NOT IN (VALUES {placeholders})"
+        )
+        params = [name for pair in sorted(IGNORE_PEOPLE) for name in pair]
+    sql = f'SELECT {select} FROM "User" {where}'
+    chunks = list(
+        pd.read_sql_query(sql, conn, params=params, chunksize=USERS_CHUNKSIZE, dtype_backend="pyarrow")
+    )
     conn.close()
-    return df
-
-
-def _select_columns(df: pd.DataFrame) -> pd.DataFrame:
-    return df.drop(columns=[c for c in DROP_COLUMNS if c in df.columns], errors="ignore")
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(_align_chunk_dtypes(chunks), ignore_index=True)
+
+
+def _align_chunk_dtypes(chunks: list[pd.DataFrame]) -> list[pd.DataFrame]:
+    """
+    Stupac koji je u nekom chunku sav NULL dobije dtype string[pyarrow]. Takve stupce castamo na dtype
+    prvog chunka u kojem stupac ima vrijednosti, pa concat daje iste dtypeove kao jedno čitanje.
+    """
+    all_na = {col: [chunk[col].isna().all() for chunk in chunks] for col in chunks[0].columns}
+    target = {
+        col: next((chunk[col].dtype for chunk, na in zip(chunks, flags) if not na), chunks[0][col].dtype)
+        for col, flags in all_na.items()
+    }
+    aligned = []
+    for i, chunk in enumerate(chunks):
+        casts = {
+            col: target[col]
+            for col, flags in all_na.items()
+            if flags[i] and chunk[col].dtype != target[col]
+        }
+        aligned.append(chunk.astype(casts) if casts else chunk)
+    return aligned
 
 
 def _parse_and_merge_dirty_socks(df: pd.DataFrame) -> pd.DataFrame:
-    parsed = df["dirtySocks"].apply(parse_dirty_socks)
-    socks = pd.DataFrame(parsed.tolist(), index=df.index)
-
-    socks["dirtySocks_datum_rodjenja"] = socks["dirtySocks_datum_rodjenja"].apply(to_iso_date)
-    socks["dirtySocks_telefon"] = socks["dirtySocks_telefon"].apply(
-        lambda v: v.replace(" ", "") if pd.notna(v) and v else v
+    socks = pd.DataFrame(
+        map(parse_dirty_socks_row, df["dirtySocks"].to_numpy()),
+        columns=SOCKS_KEYS,
+        index=df.index,
     )
 
-    preb_vals = socks["dirtySocks_prebivaliste"].apply(
-        lambda v: extract_country_code_and_address(v) if pd.notna(v) else (None, None)
+    socks["dirtySocks_datum_rodjenja"] = to_iso_date_series(socks["dirtySocks_datum_rodjenja"])
+    socks["dirtySocks_telefon"] = socks["dirtySocks_telefon"].str.replace(" ", "", regex=False)
+    socks["residence"], socks["country_code"] = extract_country_code_and_address_series(
+        socks["dirtySocks_prebivaliste"]
     )
-    socks["residence"] = preb_vals.apply(lambda x: x[0])
-    socks["country_code"] = preb_vals.apply(lambda x: x[1])
 
-    users_clean = df.drop(columns=["dirtySocks"], errors="ignore").copy()
+    users_clean = df.drop(columns=["dirtySocks"], errors="ignore")
     users_clean["user_id"] = users_clean["id"]
 
     merged = users_clean.merge(
@@ -122,13 +169,13 @@ def _parse_and_merge_dirty_socks(df: pd.DataFrame) -> pd.DataFrame:
         how="left",
     )
 
-    merged["oib"] = merged.apply(_merge_oib_row, axis=1)
+    merged["oib"] = _first_valid(merged, ["oib", "taxNumber", "cardId"])
     merged = merged.drop(columns=["id", "taxNumber", "cardId"], errors="ignore")
 
-    merged["date_of_birth"] = merged.apply(_merge_date_row, axis=1)
+    merged["date_of_birth"] = _merge_date(merged)
     merged = merged.drop(columns=["dateOfBirth"], errors="ignore")
 
-    merged["phone"] = merged.apply(_merge_phone_row, axis=1)
+    merged["phone"] = _first_valid(merged, ["phone", "phone_x", "phone_y"])
     merged = merged.drop(columns=["phone_x", "phone_y"], errors="ignore")
 
     merged = merged.drop(
@@ -139,174 +186,190 @@ def _parse_and_merge_dirty_socks(df: pd.DataFrame) -> pd.DataFrame:
     return merged
 
 
-def _merge_oib_row(row) -> str | None:
-    for key in ("oib", "taxNumber", "cardId"):
-        v = row.get(key)
-        if pd.notna(v) and str(v).strip() and str(v).strip() != "nan":
-            s = str(v).strip()
-            if isinstance(v, float) and v == int(v):
-                return str(int(v))
-            return s
-    return None
-
-
-def _merge_date_row(row) -> str | None:
-    dob = row.get("date_of_birth")
-    if pd.notna(dob) and str(dob).strip() and str(dob).strip() != "nan":
-        return str(dob).strip()
-    ts = row.get("dateOfBirth")
-    if pd.notna(ts):
-        dt = pd.to_datetime(ts, unit="ms", errors="coerce")
-        if pd.notna(dt):
-            return dt.strftime("%Y-%m-%d")
-    return None
-
-
-def _merge_phone_row(row) -> str | None:
-    for key in ("phone", "phone_x", "phone_y"):
-        v = row.get(key)
-        if pd.notna(v):
-            if isinstance(v, (int, float)) and v == int(v):
-                return str(int(v))
-            s = str(v).strip()
-            if s and s.lower() != "nan":
-                return s
-    return None
+def _clean_scalar(v) -> str:
+    if isinstance(v, (int, float)) and v == int(v):
+        return str(int(v))
+    return str(v).strip()
+
+
+def _to_clean_str(s: pd.Series) -> pd.Series:
+    """Stupac kao ošišani string; prazno i "nan" → NA, cijeli brojevi bez ".0"."""
+    if pd.api.types.is_integer_dtype(s):
+        out = s.astype("string")
+    elif pd.api.types.is_float_dtype(s):
+        out = s.astype("string")
+        integral = s.notna() & np.isfinite(s) & (s == np.trunc(s))
+        out[integral] = s[integral].astype("int64").astype("string")
+    elif pd.api.types.infer_dtype(s, skipna=True) in ("string", "empty"):
+        out = s.astype("string").str.strip()
+    else:
+        out = s.map(_clean_scalar, na_action="ignore").astype("string")
+    blank = (out.eq("") | out.str.lower().eq("nan")).fillna(False).astype(bool)
+    return out.mask(blank)
+
+
+def _first_valid(df: pd.DataFrame, columns: list[str]) -> pd.Series:
+    """Prva ne-prazna vrijednost po retku, redom kroz stupce koji postoje."""
+    result = pd.Series(pd.NA, index=df.index, dtype="string")
+    for col in columns:
+        if col in df.columns:
+            result = result.combine_first(_to_clean_str(df[col]))
+    return result.astype(object).where(result.notna(), None)
+
+
+def _merge_date(df: pd.DataFrame) -> pd.Series:
+    """date_of_birth iz dirtySocks, inače dateOfBirth (ms) kao YYYY-MM-DD."""
+    result = _first_valid(df, ["date_of_birth"])
+    if "dateOfBirth" in df.columns:
+        ts = pd.to_datetime(pd.to_numeric(df["dateOfBirth"], errors="coerce"), unit="ms", errors="coerce")
+        result = result.combine_first(ts.dt.strftime("%Y-%m-%d"))
+    return result.astype(object).where(result.notna(), None)
+
+
+def _clean_text(s: pd.Series) -> pd.Series:
+    """Samo ne-prazne vrijednosti kao ošišan tekst; "nan" i "<NA>" se smatraju praznima."""
+    out = s.dropna().astype(str).str.strip()
+    return out[~out.isin(("", "nan", "<NA>"))]
+
+
+def _join_unique(values: pd.Series, keys: pd.Series, sep: str) -> pd.Series:
+    """Po ključu grupe: jedinstvene vrijednosti redom pojave, spojene sa sep kad ih je više."""
+    uniq = values.groupby(keys.loc[values.index], sort=False).unique()
+    return uniq.map(lambda u: sep.join(u) if len(u) > 1 else u[0])
+
+
+def _or_none(s: pd.Series) -> pd.Series:
+    return s.astype(object).where(s.notna(), None)
 
 
 def _merge_oib_duplicates(df: pd.DataFrame) -> pd.DataFrame:
-    oib_dup = df[df["oib"].notna()].groupby("oib").filter(lambda g: len(g) > 1)
-    if len(oib_dup) == 0:
+    sizes = df.groupby("oib")["oib"].transform("size")
+    dup_mask = df["oib"].notna() & sizes.gt(1)
+    if not dup_mask.any():
         return df
-    oib_single = df[~df.index.isin(oib_dup.index)]
-    merged_rows = []
-    for oib, group in oib_dup.groupby("oib"):
-        row = group.iloc[0].to_dict()
-        row["createdAt"] = group["createdAt"].min()
-        row["updatedAt"] = group["updatedAt"].min()
-        phones = (
-            group["phone"]
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .replace("nan", "")
-            .replace("<NA>", "")
-        )
-        phones = phones[phones != ""].unique().tolist()
-        row["phone"] = SEP.join(phones) if len(phones) > 1 else (phones[0] if phones else None)
-        emails = (
-            group["email"]
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .replace("nan", "")
-            .replace("<NA>", "")
-        )
-        emails = emails[emails != ""].unique().tolist()
-        row["email"] = SEP.join(emails) if len(emails) > 1 else (emails[0] if emails else None)
-        dobs = group["date_of_birth"].dropna()
-        dobs = pd.to_datetime(dobs, errors="coerce").dropna()
-        row["date_of_birth"] = (
-            dobs.iloc[0].strftime("%Y-%m-%d")
-            if len(dobs) > 0
-            else group["date_of_birth"].iloc[0]
-        )
-        row["user_id"] = ", ".join(group["user_id"].dropna().astype(str).unique())
-        row["faculty"] = group["faculty"].dropna().iloc[0] if group["faculty"].notna().any() else None
-        countries = (
-            group["country"]
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .replace("nan", "")
-            .replace("<NA>", "")
+    oib_single = df[~dup_mask]
+    dup = df[dup_mask]
+    keys = dup["oib"]
+    grouped = dup.groupby("oib")
+    order = grouped.size().index
+
+    # Prvi redak grupe je osnova, zatim se polja preko cijele grupe računaju po stupcu.
+    merged = dup.drop_duplicates("oib").set_index("oib", drop=False).loc[order]
+    merged["createdAt"] = grouped["createdAt"].min()
+    merged["updatedAt"] = grouped["updatedAt"].min()
+    for col, sep in (("phone", SEP), ("email", SEP), ("country", ", ")):
+        merged[col] = _or_none(_join_unique(_clean_text(dup[col]), keys, sep).reindex(order))
+    dobs = pd.to_datetime(dup["date_of_birth"], format="%Y-%m-%d", errors="coerce")
+    first_dob = dobs.groupby(keys).first().reindex(order)
+    merged["date_of_birth"] = _or_none(first_dob.dt.strftime("%Y-%m-%d")).where(
+        first_dob.notna(), merged["date_of_birth"]
+    )
+    user_ids = dup["user_id"].dropna().astype(str)
+    merged["user_id"] = _join_unique(user_ids, keys, ", ").reindex(order, fill_value="")
+    merged["faculty"] = _or_none(grouped["faculty"].first().reindex(order))
+    return pd.concat([oib_single, merged.reset_index(drop=True)], ignore_index=True)
+
+
+def _mn_char_class() -> str:
+    """Regex klasa svih nespacing znakova (kategorija Mn) u BMP-u, kao niz raspona."""
+    ranges: list[tuple[int, int]] = []
+    for cp in range(0x10000):
+        if unicodedata.category(chr(cp)) == "Mn":
+            if ranges and ranges[-1][1] == cp - 1:
+                ranges[-1] = (ranges[-1][0], cp)
+            else:
+                ranges.append((cp, cp))
+    return "[" + "".join(f"\\u{lo:04x}-\\u{hi:04x}" for lo, hi in ranges) + "]"
+
+
+COMBINING_MARKS = _mn_char_class()
+
+
+def _latin_translate_table() -> dict[int, str]:
+    """č→c, ć→c, š→s, ž→z, é→e… za Latin-1 i Latin Extended-A, izvedeno iz NFD-a (đ nema rastav i ostaje)."""
+    table = {}
+    for cp in range(0xC0, 0x180):
+        stripped = "".join(
+            c for c in unicodedata.normalize("NFD", chr(cp)) if unicodedata.category(c) != "Mn"
         )
-        countries = countries[countries != ""].unique().tolist()
-        row["country"] = ", ".join(countries) if len(countries) > 1 else (countries[0] if countries else None)
-        merged_rows.append(row)
-    return pd.concat([oib_single, pd.DataFrame(merged_rows)], ignore_index=True)
+        if stripped != chr(cp):
+            table[cp] = stripped
+    return table
 
 
-def _strip_hr(s) -> str:
-    if pd.isna(s) or not str(s).strip():
-        return ""
-    t = unicodedata.normalize("NFD", str(s).strip().lower())
-    return "".join(c for c in t if unicodedata.category(c) != "Mn")
+LATIN_TRANSLATE = _latin_translate_table()
 
 
-def _merge_dofb_lastname_duplicates(df: pd.DataFrame) -> pd.DataFrame:
-    out = df.copy()
-    out["_ln"] = out["lastName"].apply(_strip_hr)
-    out["_dofb"] = out["date_of_birth"].fillna("")
-    dup = (
-        out[(out["_dofb"] != "") & (out["_ln"] != "")]
-        .groupby(["_dofb", "_ln"])
-        .filter(lambda g: len(g) > 1)
+def _strip_hr(s: pd.Series) -> pd.Series:
+    """Prezimena za usporedbu: ošišana, mala slova, bez dijakritika (NFD pa bez Mn znakova)."""
+    t = s.where(s.notna(), "").astype(str).str.strip().str.lower().str.translate(LATIN_TRANSLATE)
+    # Hrvatska imena su nakon translate gotova; NFD samo za retke sa znakovima izvan tablice.
+    rest = t.str.contains(r"[^\x00-\u017f]", regex=True)
+    if rest.any():
+        t[rest] = t[rest].str.normalize("NFD").str.replace(COMBINING_MARKS, "", regex=True)
+    return t
+
+
+def _strip_placeholders(s: pd.Series) -> pd.Series:
+    """Samo ne-prazne vrijednosti kao ošišan tekst, s "nan" i "<NA>" uklonjenima iz vrijednosti."""
+    out = (
+        s.dropna()
+        .astype(str)
+        .str.strip()
+        .str.replace("nan", "", regex=False)
+        .str.replace("<NA>", "", regex=False)
     )
-    if len(dup) == 0:
-        return out.drop(columns=["_ln", "_dofb"], errors="ignore")
+    return out[out != ""]
 
-    merge_indices = set()
-    for (dofb, ln), grp in dup.groupby(["_dofb", "_ln"]):
-        oibs = (
-            grp["oib"]
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .str.replace("nan", "")
-            .str.replace("<NA>", "")
-        )
-        oibs = oibs[oibs != ""].unique()
-        if len(oibs) != 1:
-            continue
-        merge_indices.update(grp.index.tolist())
 
-    if not merge_indices:
+def _merge_dofb_lastname_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+    out = df.assign(_ln=_strip_hr(df["lastName"]), _dofb=df["date_of_birth"].fillna(""))
+    keyed = out[(out["_dofb"] != "") & (out["_ln"] != "")]
+    dup = keyed[keyed.groupby(["_dofb", "_ln"])["_ln"].transform("size") > 1]
+    if len(dup) == 0:
         return out.drop(columns=["_ln", "_dofb"], errors="ignore")
 
-    non_merge = out[~out.index.isin(merge_indices)].copy()
-    merged_rows = []
-    for (dofb, ln), grp in dup.groupby(["_dofb", "_ln"]):
-        oibs = (
-            grp["oib"]
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .str.replace("nan", "")
-            .str.replace("<NA>", "")
-        )
-        oibs = oibs[oibs != ""].unique()
-        if len(oibs) != 1:
+    # Spajaju se samo grupe s točno jednim OIB-om.
+    gid = dup.groupby(["_dofb", "_ln"]).ngroup()
+    oib_count = _strip_placeholders(dup["oib"]).groupby(gid).nunique()
+    mergeable = oib_count.index[oib_count == 1]
+    if len(mergeable) == 0:
+        return out.drop(columns=["_ln", "_dofb"], errors="ignore")
+    grp = dup[gid.isin(mergeable)]
+    gid = gid[grp.index]
+
+    non_merge = out[~out.index.isin(grp.index)]
+    by_gid = grp.groupby(gid)
+    oldest = grp.sort_values("createdAt").groupby(gid).head(1)
+    merged = {
+        "createdAt": by_gid["createdAt"].min(),
+        "updatedAt": by_gid["updatedAt"].min(),
+        "faculty": pd.Series(oldest["faculty"].to_numpy(), index=gid[oldest.index]).reindex(mergeable),
+    }
+    cols_exclude = {"_ln", "_dofb", "createdAt", "updatedAt", "faculty"}
+    for col in grp.columns:
+        if col in cols_exclude:
             continue
-        grp_sorted = grp.sort_values("createdAt")
-        oldest = grp_sorted.iloc[0]
-        row = {}
-        row["createdAt"] = grp["createdAt"].min()
-        row["updatedAt"] = grp["updatedAt"].min()
-        row["faculty"] = oldest["faculty"]
-        cols_exclude = {"_ln", "_dofb", "createdAt", "updatedAt", "faculty"}
-        for col in grp.columns:
-            if col in cols_exclude:
-                continue
-            vals = (
-                grp[col]
-                .dropna()
-                .astype(str)
-                .str.strip()
-                .str.replace("nan", "")
-                .str.replace("<NA>", "")
-            )
-            vals = vals[vals != ""].unique().tolist()
-            if len(vals) == 0:
-                row[col] = None
-            elif len(vals) == 1:
-                row[col] = grp[col].dropna().iloc[0]
-            else:
-                row[col] = ", ".join(vals) if col == "user_id" else SEP.join(vals)
-        merged_rows.append(row)
+        uniq = _strip_placeholders(grp[col]).groupby(gid).unique().reindex(mergeable)
+        n_unique = uniq.map(len, na_action="ignore")
+        first = by_gid[col].first().reindex(mergeable)
+        if not (n_unique > 1).any():
+            # Nigdje se ništa ne spaja: prva vrijednost grupe, u dtype-u izvornog stupca.
+            merged[col] = first.where(n_unique.notna())
+            continue
+        sep = ", " if col == "user_id" else SEP
+        merged[col] = pd.Series(
+            [
+                None if pd.isna(n) else f if n == 1 else sep.join(u)
+                for u, n, f in zip(uniq, n_unique, first)
+            ],
+            index=mergeable,
+            dtype=object,
+        )
+    merged_rows = pd.DataFrame(merged, index=mergeable).reset_index(drop=True)
 
     result = pd.concat(
-        [non_merge.drop(columns=["_ln", "_dofb"], errors="ignore"), pd.DataFrame(merged_rows)],
+        [non_merge.drop(columns=["_ln", "_dofb"], errors="ignore"), merged_rows],
         ignore_index=True,
     )
     return result
@@ -324,20 +387,9 @@ def main() -> None:
 
     df = _load_users(db_path)
 
-    ignored = df.apply(
-        lambda row: (
-            str(row.get("firstName") or "").strip(),
-            str(row.get("lastName") or "").strip(),
-        )
-        in IGNORE_PEOPLE,
-        axis=1,
-    )
-    df = df[~ignored].copy()
-
     limit = int(os.environ.get("PEOPLE_PIPELINE_LIMIT", 0)) or None
     if limit:
         df = df.head(limit)
-    df = _select_columns(df)
 
     df = _parse_and_merge_dirty_socks(df)
     skip_geocode = os.environ.get("PEOPLE_PIPELINE_SKIP_GEOCODE", "").lower() in ("1", "true", "yes")
@@ -350,7 +402,7 @@ def main() -> None:
     df = df.drop(columns=["i", "phone"], errors="ignore")
     df = df.drop(columns=["gender"], errors="ignore").rename(columns={"gender_inferred": "gender"})
     cols = [c for c in OUTPUT_COLUMNS if c in df.columns]
-    df[cols].to_csv(output_path, index=False)
+    write_csv(df[cols], output_path)
     print(f"Output: {output_path}")
 
 
@@ -19,33 +19,32 @@ LABEL_TO_KEY = {
 }
 
 
+# <span>Label:</span> value – labele se dekodiraju prije usporedbe, pa uzorak ostaje općenit
+SPAN_VALUE = re.compile(r"<span[^>]*>([^<]+)</span>\s*([^<]*)")
+
+SOCKS_KEYS = list(LABEL_TO_KEY.values())
+LABEL_TO_IDX = {label: SOCKS_KEYS.index(key) for label, key in LABEL_TO_KEY.items()}
+
+
+def parse_dirty_socks_row(html_str: str) -> tuple:
+    """Kao parse_dirty_socks, ali vraća tuple vrijednosti poredanih kao SOCKS_KEYS."""
+    result = [None] * len(SOCKS_KEYS)
+    if pd.isna(html_str) or not str(html_str).strip():
+        return tuple(result)
+
+    for m in SPAN_VALUE.finditer(html_str):
+        idx = LABEL_TO_IDX.get(html.unescape(m.group(1)).strip())
+        if idx is not None:
+            result[idx] = html.unescape(m.group(2)).strip() or None
+    return tuple(result)
+
+
 def parse_dirty_socks(html_str: str) -> dict:
     """
     Parsira HTML iz stupca dirtySocks u dict s poljima:
     dirtySocks_prebivaliste, dirtySocks_boraviste, ...
     """
-    empty = {
-        "dirtySocks_prebivaliste": None,
-        "dirtySocks_boraviste": None,
-        "dirtySocks_drzavljanstvo": None,
-        "dirtySocks_oib": None,
-        "dirtySocks_jmbag": None,
-        "dirtySocks_esi": None,
-        "dirtySocks_datum_rodjenja": None,
-        "dirtySocks_telefon": None,
-    }
-    if pd.isna(html_str) or not str(html_str).strip():
-        return empty
-
-    result = empty.copy()
-    pattern = r"<span[^>]*>([^<]+)</span>\s*([^<]*)"
-    for label, value in re.findall(pattern, html_str):
-        label = html.unescape(label).strip()
-        value = html.unescape(value).strip() or None
-        key = LABEL_TO_KEY.get(label)
-        if key:
-            result[key] = value
-    return result
+    return dict(zip(SOCKS_KEYS, parse_dirty_socks_row(html_str)))
 
 
 def to_iso_date(val) -> str | None:
@@ -72,3 +71,35 @@ def extract_country_code_and_address(val) -> tuple[str | None, str | None]:
         address_clean = re.sub(r"\s+", " ", address_clean).strip()
         return address_clean, code
     return s, None
+
+
+# D.M.YYYY s točno tri dijela, kao u to_iso_date
+DMY_PARTS = r"^(?P<d>[^.]*)\.(?P<m>[^.]*)\.(?P<y>[^.]{4})$"
+COUNTRY_CODE = r"\(([A-Z]{2})\)"
+
+
+def to_iso_date_series(s: pd.Series) -> pd.Series:
+    """to_iso_date za cijeli stupac odjednom."""
+    parts = s.str.strip().str.extract(DMY_PARTS)
+    iso = parts["y"] + "-" + parts["m"].str.zfill(2) + "-" + parts["d"].str.zfill(2)
+    return iso.astype(object).where(iso.notna(), None)
+
+
+def extract_country_code_and_address_series(s: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """extract_country_code_and_address za cijeli stupac: vraća (address_clean, country_code)."""
+    stripped = s.str.strip()
+    stripped = stripped.where(stripped.ne(""))
+    code = stripped.str.extract(COUNTRY_CODE, expand=False)
+    has_code = code.notna()
+    cleaned = (
+        stripped[has_code]
+        .str.replace(r"\s*\([A-Z]{2}\)\s*,\s*", ", ", regex=True)
+        .str.replace(r"\s*\([A-Z]{2}\)\s*", " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+    address = stripped.mask(has_code, cleaned)
+    return (
+        address.astype(object).where(address.notna(), None),
+        code.astype(object).where(has_code, None),
+    )
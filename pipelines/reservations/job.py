@@ -11,7 +11,11 @@ import pandas as pd
 import sqlite3
 
 from pipelines.events.job import IGNORE_TITLES, load_events
-from utils.distance import distance_km
+from utils.csv_writer import write_csv
+from utils.distance import distance_km_vec
+
+# Copy-on-write: column subsets and renames below stay views until written
+pd.options.mode.copy_on_write = True
 
 
 def _project_root() -> Path:
@@ -32,34 +36,19 @@ def _load_reservations(db_path: Path):
         AND e.deletedAt IS NULL
         AND e.cancelledAt IS NULL
         AND e.title NOT IN ({ignore_sql})
-    """, conn)
+    """, conn, dtype_backend="pyarrow")
     conn.close()
-    return df
+    # Epoch-millisecond columns; nullable so NULL attendedAt does not turn them into floats
+    return df.astype({"createdAt": "Int64", "attendedAt": "Int64", "updatedAt": "Int64"})
 
 
 def _add_time_diff_columns(df: pd.DataFrame, events: pd.DataFrame) -> pd.DataFrame:
     """Add createdAt, attendedAt, cancelledAt differences from event startsAt (milliseconds)."""
-    events_starts = events[["id", "startsAt"]].copy()
-    events_starts["id"] = events_starts["id"].astype(str)
-    df = df.merge(
-        events_starts,
-        left_on=df["eventId"].astype(str),
-        right_on="id",
-        how="left",
-    )
-    starts_ms = pd.to_numeric(df["startsAt"], errors="coerce")
-    created_ms = pd.to_numeric(df["createdAt"], errors="coerce")
-    attended_ms = pd.to_numeric(df["attendedAt"], errors="coerce")
-    updated_ms = pd.to_numeric(df["updatedAt"], errors="coerce")
-
-    df["createdAtMinusStartsAt"] = created_ms - starts_ms
-    df["attendedAtMinusStartsAt"] = attended_ms - starts_ms
-
-    cancelled_mask = df["status"] == 2
-    df["cancelledAtMinusStartsAt"] = None
-    df.loc[cancelled_mask, "cancelledAtMinusStartsAt"] = (
-        updated_ms.loc[cancelled_mask] - starts_ms.loc[cancelled_mask]
-    )
+    df = df.merge(events[["id", "startsAt"]], left_on="eventId", right_on="id", how="left")
+    starts_ms = df["startsAt"].astype("Int64")
+    df["createdAtMinusStartsAt"] = df["createdAt"] - starts_ms
+    df["attendedAtMinusStartsAt"] = df["attendedAt"] - starts_ms
+    df["cancelledAtMinusStartsAt"] = (df["updatedAt"] - starts_ms).where(df["status"] == 2)
 
     df = df.drop(columns=["id", "startsAt"], errors="ignore")
     return df
@@ -71,8 +60,15 @@ def _load_people_expanded(root: Path) -> pd.DataFrame:
     if not path.exists():
         return pd.DataFrame(columns=["user_id", "date_of_birth", "lat", "lng"])
     people = pd.read_csv(path, usecols=["user_id", "date_of_birth", "lat", "lng"])
-    people["user_id"] = people["user_id"].astype(str).str.split(r",\s*")
-    return people.explode("user_id", ignore_index=True)
+    # Merged people carry ids joined with ", " (see people pipeline); one row per id.
+    parts = people["user_id"].astype(str).str.split(", ", regex=False)
+    lens = parts.str.len().to_numpy()
+    return pd.DataFrame({
+        "user_id": [uid for ids in parts for uid in ids],
+        "date_of_birth": np.repeat(people["date_of_birth"].to_numpy(), lens),
+        "lat": np.repeat(people["lat"].to_numpy(), lens),
+        "lng": np.repeat(people["lng"].to_numpy(), lens),
+    })
 
 
 def _add_age_and_distance(
@@ -81,11 +77,9 @@ def _add_age_and_distance(
     events: pd.DataFrame,
 ) -> pd.DataFrame:
     """Add ageAtReservation (years) and distanceKm (event to person residence)."""
-    events_loc = events[["id", "lat", "lng"]].copy()
-    events_loc["id"] = events_loc["id"].astype(str)
     df = df.merge(
-        events_loc,
-        left_on=df["eventId"].astype(str),
+        events[["id", "lat", "lng"]],
+        left_on="eventId",
         right_on="id",
         how="left",
         suffixes=("", "_event"),
@@ -93,33 +87,27 @@ def _add_age_and_distance(
     df = df.rename(columns={"lat": "event_lat", "lng": "event_lng"})
     df = df.drop(columns=["id"], errors="ignore")
 
-    people_sub = people[["user_id", "date_of_birth", "lat", "lng"]].copy()
-    people_sub = people_sub.rename(columns={"lat": "person_lat", "lng": "person_lng"})
-    df = df.merge(
-        people_sub,
-        left_on=df["userId"].astype(str),
-        right_on="user_id",
-        how="left",
+    people_sub = people[["user_id", "date_of_birth", "lat", "lng"]].rename(
+        columns={"lat": "person_lat", "lng": "person_lng"}
     )
+    df = df.merge(people_sub, left_on="userId", right_on="user_id", how="left")
     df = df.drop(columns=["user_id"], errors="ignore")
 
-    created_ms = pd.to_numeric(df["createdAt"], errors="coerce")
+    created_ms = pd.to_numeric(df["createdAt"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
     dob_dt = pd.to_datetime(df["date_of_birth"], format="%Y-%m-%d", errors="coerce")
+    dob_ms = dob_dt.to_numpy(dtype="datetime64[ms]").view(np.int64)
     ms_per_year = 365.25 * 24 * 3600 * 1000
-    df["ageAtReservation"] = np.nan
-    valid_dob = dob_dt.notna()
-    df.loc[valid_dob, "ageAtReservation"] = (
-        created_ms.loc[valid_dob] - dob_dt.loc[valid_dob].astype("int64") / 1e6
-    ) / ms_per_year
-
-    def _dist(row):
-        elat, elng = row.get("event_lat"), row.get("event_lng")
-        plat, plng = row.get("person_lat"), row.get("person_lng")
-        if pd.isna(elat) or pd.isna(elng) or pd.isna(plat) or pd.isna(plng):
-            return np.nan
-        return distance_km((float(elat), float(elng)), (float(plat), float(plng)))
-
-    df["distanceKm"] = df.apply(_dist, axis=1)
+    df["ageAtReservation"] = np.where(dob_dt.isna().to_numpy(), np.nan, (created_ms - dob_ms) / ms_per_year)
+
+    coords = np.column_stack([
+        pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        for c in ("event_lat", "event_lng", "person_lat", "person_lng")
+    ])
+    # Without geocoding most rows have no coordinates; only the complete ones get the haversine.
+    valid = np.isfinite(coords).all(axis=1)
+    dist = np.full(len(df), np.nan)
+    dist[valid] = distance_km_vec(*coords[valid].T)
+    df["distanceKm"] = dist
     df = df.drop(
         columns=["event_lat", "event_lng", "person_lat", "person_lng", "date_of_birth"],
         errors="ignore",
@@ -133,9 +121,10 @@ def load_reservations(db_path: Path | None = None, *, skip_geocode: bool = True)
     path = Path(db_path) if db_path else root / "data" / "source" / "data.db"
     df = _load_reservations(path)
 
-    events = load_events(path, skip_geocode=skip_geocode)
-    valid_event_ids = set(events["id"].astype(str))
-    df = df[df["eventId"].astype(str).isin(valid_event_ids)]
+    # Join keys are cast to str once here; every merge below matches on them as-is.
+    df = df.astype({"eventId": str, "userId": str})
+    events = load_events(path, skip_geocode=skip_geocode).astype({"id": str})
+    df = df[df["eventId"].isin(events["id"])]
     df = _add_time_diff_columns(df, events)
 
     people = _load_people_expanded(root)
@@ -154,7 +143,7 @@ def main() -> None:
         raise FileNotFoundError(f"Input database not found: {db_path}")
 
     df = load_reservations(db_path)
-    df.to_csv(output_path, index=False)
+    write_csv(df, output_path)
     print(f"Output: {output_path} ({len(df)} reservations)")
 
 
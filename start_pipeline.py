@@ -1,8 +1,14 @@
 """
-Run pipelines in order: people -> faculties -> map_faculties_to_people -> events -> reservations
+Run pipelines in dependency order:
+people -> (faculties -> map_faculties_to_people | events) -> reservations
+
+faculties and map_faculties_to_people read people.csv; events only reads data.db, so the two
+branches run in parallel processes. people runs alone first because it shares the geocode cache
+with events.
 """
 
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 os.environ["PEOPLE_PIPELINE_SKIP_GEOCODE"] = "0"
 
@@ -12,9 +18,16 @@ from pipelines.map_faculties_to_people.job import main as map_faculties_main
 from pipelines.events.job import main as events_main
 from pipelines.reservations.job import main as reservations_main
 
-if __name__ == "__main__":
-    people_main()
+
+def _faculties_branch() -> None:
     faculties_main()
     map_faculties_main()
-    events_main()
+
+
+if __name__ == "__main__":
+    people_main()
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        branches = [pool.submit(_faculties_branch), pool.submit(events_main)]
+        for branch in branches:
+            branch.result()
     reservations_main()
@@ -0,0 +1,65 @@
+"""
+Tests for pipelines.people.job: loading User rows from SQLite.
+"""
+
+import sqlite3
+import warnings
+
+import pandas as pd
+
+from pipelines.people import job
+
+USER_COLUMNS = {
+    "id": "TEXT PRIMARY KEY",
+    "firstName": "TEXT",
+    "lastName": "TEXT",
+    "dateOfBirth": "INTEGER",
+    "createdAt": "INTEGER",
+    "dirtySocks": "TEXT",
+    "password": "TEXT",
+}
+
+# The first rows are NULL in every nullable column, so with a chunk size of 2 the first chunk
+# has all-NULL columns while later chunks have values.
+USER_ROWS = [
+    ("u1", None, None, None, None, None, None),
+    ("u2", None, None, None, None, None, None),
+    ("u3", "Ana", "Horvat", 946684800000, 1700000000000, "<span>x</span>", "secret"),
+    ("u4", " Dražen\t", "Barić", 946684800001, None, None, None),
+    ("u5", "Ivo", "Ivić", None, 1700000000001, None, None),
+]
+
+
+def _make_db(path) -> None:
+    conn = sqlite3.connect(path)
+    columns = ", ".join(f'"{name}" {sql_type}' for name, sql_type in USER_COLUMNS.items())
+    conn.execute(f'CREATE TABLE "User" ({columns})')
+    conn.executemany(f'INSERT INTO "User" VALUES ({", ".join("?" * len(USER_COLUMNS))})', USER_ROWS)
+    conn.commit()
+    conn.close()
+
+
+def test_load_users_chunked_matches_single_read(tmp_path, monkeypatch):
+    db_path = tmp_path / "data.db"
+    _make_db(db_path)
+
+    single = job._load_users(db_path)
+
+    monkeypatch.setattr(job, "USERS_CHUNKSIZE", 2)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        chunked = job._load_users(db_path)
+
+    pd.testing.assert_frame_equal(chunked, single)
+    assert chunked["dateOfBirth"].dtype == "int64[pyarrow]"
+
+
+def test_load_users_filters_dropped_columns_and_ignored_people(tmp_path, monkeypatch):
+    db_path = tmp_path / "data.db"
+    _make_db(db_path)
+    monkeypatch.setattr(job, "USERS_CHUNKSIZE", 2)
+
+    df = job._load_users(db_path)
+
+    assert "password" not in df.columns
+    assert df["id"].tolist() == ["u1", "u2", "u3", "u5"]
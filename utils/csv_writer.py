@@ -0,0 +1,24 @@
+"""
+Write pipeline outputs to CSV via pyarrow's C++ writer.
+Falls back to pandas to_csv for columns Arrow cannot type (mixed Python objects).
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+
+def write_csv(df: pd.DataFrame, path: Path) -> None:
+    """
+    Write df to path without the index.
+    Strings are always quoted, booleans written as true/false and floats in shortest round-trip form;
+    pd.read_csv reads all of them back to the same values.
+    """
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df.to_csv(path, index=False, lineterminator="\n")
+        return
+    pacsv.write_csv(table, str(path))
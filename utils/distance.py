@@ -5,6 +5,8 @@ Returns great-circle distance in kilometers.
 
 import math
 
+import numpy as np
+
 EARTH_RADIUS_KM = 6371.0
 
 
@@ -34,3 +36,22 @@ def distance_km(
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
     return EARTH_RADIUS_KM * c
+
+
+def distance_km_vec(
+    lat1: np.ndarray,
+    lng1: np.ndarray,
+    lat2: np.ndarray,
+    lng2: np.ndarray,
+) -> np.ndarray:
+    """
+    Array form of distance_km: element-wise great-circle distance in kilometers.
+    Inputs are degrees; NaN in any coordinate gives NaN for that element.
+    """
+    phi1 = np.deg2rad(lat1)
+    phi2 = np.deg2rad(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.deg2rad(lng2) - np.deg2rad(lng1)
+
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
@@ -3,16 +3,90 @@ Geocode address strings to lat/lng via Nominatim.
 Uses data/cache/geocode_cache.json for persistent cache.
 """
 
+import atexit
+import functools
 import json
+import os
 import re
+import threading
 import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used without it
+    orjson = None
+
 USER_AGENT = "unist-sport/1.0"
 RATE_LIMIT_SEC = 1.1
+REQUEST_TIMEOUT = (5, 30)  # connect, read (seconds)
+# Transient server errors / dropped connections are retried by _fetch_nominatim, each attempt rate-limited
+RETRY_STATUS = frozenset({502, 503, 504})
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_SEC = 0.5
+
+PUBLIC_NOMINATIM_ENDPOINT = "https://nominatim.openstreetmap.org/search"
+# Self-hosted Nominatim: set NOMINATIM_ENDPOINT and optionally raise NOMINATIM_RPS
+NOMINATIM_ENDPOINT = os.environ.get("NOMINATIM_ENDPOINT", PUBLIC_NOMINATIM_ENDPOINT)
+NOMINATIM_RPS = float(os.environ.get("NOMINATIM_RPS", 1 / RATE_LIMIT_SEC))
+if NOMINATIM_ENDPOINT == PUBLIC_NOMINATIM_ENDPOINT:
+    # Public usage policy: never faster than one request per RATE_LIMIT_SEC, whatever the env says
+    NOMINATIM_RPS = min(NOMINATIM_RPS, 1 / RATE_LIMIT_SEC)
+# The public server must be queried serially; a private one gets this many concurrent workers
+PRIVATE_ENDPOINT_WORKERS = 4
+
+
+class RateLimiter:
+    """Token bucket shared by all threads: at most `rate` requests per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take a token, sleeping until it is available. Waiting callers are served in arrival order."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+_RATE_LIMITER = RateLimiter(NOMINATIM_RPS)
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _session():
+    """
+    Shared requests.Session: keep-alive connections and gzip. The adapter does not retry;
+    retries would bypass the rate limiter, so _fetch_nominatim does them.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
 
-_LAST_REQUEST_TIME = 0.0
+            session = requests.Session()
+            session.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": "gzip"})
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=PRIVATE_ENDPOINT_WORKERS, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSION = session
+    return _SESSION
+
+
+def _geocode_workers() -> int:
+    return 1 if NOMINATIM_ENDPOINT == PUBLIC_NOMINATIM_ENDPOINT else PRIVATE_ENDPOINT_WORKERS
 
 
 def _project_root() -> Path:
@@ -27,16 +101,38 @@ def _ensure_cache_dir() -> None:
     cache_path().parent.mkdir(parents=True, exist_ok=True)
 
 
+def _read_json(path: Path) -> dict:
+    """Parse a JSON file with orjson when installed. Raises json.JSONDecodeError on bad input."""
+    raw = path.read_bytes()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _write_json(path: Path, data: dict) -> None:
+    """
+    Serialize in memory and write once; compact UTF-8, since the cache is not edited by hand.
+    Written to a temp file and renamed over path, so a crash mid-write never leaves a truncated cache.
+    """
+    if orjson is not None:
+        raw = orjson.dumps(data)
+    else:
+        raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_bytes(raw)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
 def _migrate_legacy_cache() -> None:
     """Copy residence_lat_lng.json to geocode_cache.json if geocode_cache doesn't exist."""
     legacy = _project_root() / "data" / "cache" / "residence_lat_lng.json"
     cache = cache_path()
     if legacy.exists() and not cache.exists():
         _ensure_cache_dir()
-        with open(legacy, encoding="utf-8") as f:
-            data = json.load(f)
-        with open(cache, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        _write_json(cache, _read_json(legacy))
 
 
 COUNTRY_NAMES = {
@@ -60,6 +156,8 @@ COUNTRY_NAMES = {
 }
 
 
+# Pure string prep, called for the same addresses over and over; entries are small strings
+@functools.lru_cache(maxsize=100_000)
 def build_query(address: str | None, country_code: str | None) -> str | None:
     cc = (country_code or "").upper()
     if not cc or len(cc) != 2:
@@ -71,6 +169,9 @@ def build_query(address: str | None, country_code: str | None) -> str | None:
     return f"{q}, {country_name}" if not q.endswith(country_name) else q
 
 
+STREET_NUMBER_SUFFIX = re.compile(r"\s*\d+[a-zA-Z]?\s*$")
+
+
 def _fallback_queries(cache_key: str) -> list[str]:
     """Generate simpler queries to try when full address returns null."""
     if not cache_key or ", " not in cache_key:
@@ -88,7 +189,7 @@ def _fallback_queries(cache_key: str) -> list[str]:
         fallbacks.append(", ".join(parts[-2:]))
     if len(parts) >= 3:
         address_part = parts[0]
-        street_no_strip = re.sub(r"\s*\d+[a-zA-Z]?\s*$", "", address_part).strip()
+        street_no_strip = STREET_NUMBER_SUFFIX.sub("", address_part).strip()
         if street_no_strip and street_no_strip != address_part:
             fallbacks.append(f"{street_no_strip}, {parts[1]}, {country}")
     return [q for q in fallbacks if q and q != cache_key]
@@ -117,52 +218,143 @@ CACHE_QUERY_CORRECTIONS = {
 KEYS_TO_PURGE_FROM_CACHE = frozenset(CACHE_QUERY_CORRECTIONS)
 
 
+# In-memory copy of the cache file; lookups no longer re-read JSON, writes are flushed once.
+_CACHE: dict | None = None
+_CACHE_MTIME: int | None = None
+_CACHE_DIRTY = False
+# Geocoding threads share the cache; guards (re)loading and flushing it
+_CACHE_LOCK = threading.RLock()
+
+
+def _cache_mtime() -> int | None:
+    try:
+        return cache_path().stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
 def _load_cache() -> dict:
+    with _CACHE_LOCK:
+        return _load_cache_locked()
+
+
+def _load_cache_locked() -> dict:
+    global _CACHE, _CACHE_MTIME, _CACHE_DIRTY
+    mtime = _cache_mtime()
+    # Reload when another process (e.g. a parallel pipeline stage) rewrote the file
+    if _CACHE is not None and (_CACHE_DIRTY or mtime == _CACHE_MTIME):
+        return _CACHE
     _migrate_legacy_cache()
-    path = cache_path()
-    if path.exists():
-        with open(path, encoding="utf-8") as f:
+    mtime = _cache_mtime()
+    data = {}
+    if mtime is not None:
+        try:
+            data = _read_json(cache_path())
+        except json.JSONDecodeError:
+            data = {}
+    _CACHE, _CACHE_MTIME = data, mtime
+    stale = data.keys() & KEYS_TO_PURGE_FROM_CACHE
+    if stale:
+        for key in stale:
+            del data[key]
+        _CACHE_DIRTY = True
+    return data
+
+
+def _save_cache() -> None:
+    """Mark the in-memory cache as changed; written to disk by flush_cache."""
+    global _CACHE_DIRTY
+    with _CACHE_LOCK:
+        _CACHE_DIRTY = True
+
+
+def flush_cache() -> None:
+    """
+    Write the in-memory cache to geocode_cache.json if it changed since the last flush.
+    Entries another process wrote since our last load are merged in first; our own keys win.
+    """
+    global _CACHE_MTIME, _CACHE_DIRTY
+    with _CACHE_LOCK:
+        if _CACHE is None or not _CACHE_DIRTY:
+            return
+        _ensure_cache_dir()
+        if _cache_mtime() not in (None, _CACHE_MTIME):
             try:
-                data = json.load(f)
-                purged = False
-                for key in KEYS_TO_PURGE_FROM_CACHE:
-                    if key in data:
-                        del data[key]
-                        purged = True
-                if purged:
-                    _save_cache(data)
-                return data
+                on_disk = _read_json(cache_path())
             except json.JSONDecodeError:
-                return {}
-    return {}
+                on_disk = {}
+            for key in on_disk.keys() - _CACHE.keys() - KEYS_TO_PURGE_FROM_CACHE:
+                _CACHE[key] = on_disk[key]
+        _write_json(cache_path(), _CACHE)
+        _CACHE_MTIME = _cache_mtime()
+        _CACHE_DIRTY = False
 
 
-def _save_cache(cache: dict) -> None:
-    _ensure_cache_dir()
-    with open(cache_path(), "w", encoding="utf-8") as f:
-        json.dump(cache, f, ensure_ascii=False, indent=2)
+atexit.register(flush_cache)
 
 
 def _fetch_nominatim(query: str, country_code: str) -> tuple[str | None, str | None]:
-    global _LAST_REQUEST_TIME
     params = {"q": query, "format": "json", "limit": 1}
     cc = (country_code or "").upper()
     if cc and len(cc) == 2:
         params["countrycodes"] = cc.lower()
-    url = "https://nominatim.openstreetmap.org/search?" + urllib.parse.urlencode(params)
+    url = NOMINATIM_ENDPOINT + "?" + urllib.parse.urlencode(params)
     import requests
 
-    for _ in range(3):
-        elapsed = time.time() - _LAST_REQUEST_TIME
-        if elapsed < RATE_LIMIT_SEC:
-            time.sleep(RATE_LIMIT_SEC - elapsed)
-        _LAST_REQUEST_TIME = time.time()
-        resp = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=30)
-        data = resp.json()
-        if data and len(data) > 0:
-            lat, lon = data[0].get("lat"), data[0].get("lon")
-            return (lat, lon) if lat and lon else (None, None)
-        return (None, None)
+    for attempt in range(RETRY_ATTEMPTS + 1):
+        if attempt:
+            time.sleep(RETRY_BACKOFF_SEC * 2 ** (attempt - 1))
+        # Every attempt, retries included, takes a token: an overloaded server is not hit faster
+        _RATE_LIMITER.acquire()
+        last_attempt = attempt == RETRY_ATTEMPTS
+        try:
+            resp = _session().get(url, timeout=REQUEST_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout):
+            if last_attempt:
+                raise
+            continue
+        if resp.status_code not in RETRY_STATUS:
+            break
+        if last_attempt:
+            resp.raise_for_status()
+    data = resp.json()
+    if data and len(data) > 0:
+        lat, lon = data[0].get("lat"), data[0].get("lon")
+        return (lat, lon) if lat and lon else (None, None)
+    return (None, None)
+
+
+def _cached_hit(cache: dict, query: str) -> tuple[float | None, float | None] | None:
+    """(lat, lng) for a positive cache entry; None if query is not cached or is a recorded miss."""
+    val = cache.get(query)
+    if val is None or "tried" in val:
+        return None
+    lat, lng = val.get("lat"), val.get("lng")
+    return (float(lat), float(lng)) if lat and lng else (None, None)
+
+
+def _store(query: str, value: dict) -> None:
+    # Under the lock so a reload cannot swap the cache between lookup and write
+    with _CACHE_LOCK:
+        _load_cache()[query] = value
+        _save_cache()
+
+
+def _geocode_fallbacks(query: str, cc: str, tried: list[str]) -> tuple[float | None, float | None]:
+    """
+    Try _fallback_queries(query) that are not in tried yet. A hit is cached under query;
+    otherwise the miss is cached as {"tried": [...]} so the same fallbacks are not requested again.
+    """
+    for fallback in _fallback_queries(query):
+        if fallback in tried:
+            continue
+        lat, lng = _fetch_nominatim(fallback, cc)
+        if lat and lng:
+            _store(query, {"lat": lat, "lng": lng})
+            return float(lat), float(lng)
+        tried.append(fallback)
+    _store(query, {"tried": tried})
+    return None, None
 
 
 def geocode_address(
@@ -175,6 +367,8 @@ def geocode_address(
     """
     Geocode address to (lat, lng). Uses cache, then Nominatim (unless skip_api).
     Returns (lat, lng) or (None, None).
+    Cache values are {"lat", "lng"} for hits and {"tried": [fallback, ...]} for misses
+    (None in older cache files: a miss with no fallbacks recorded).
     """
     query = build_query(address, country_code)
     if not query:
@@ -184,47 +378,33 @@ def geocode_address(
     cc = (country_code or "").upper()
     cache = _load_cache()
 
+    hit = _cached_hit(cache, query)
+    if hit is not None:
+        return hit
     if query in cache:
-        val = cache[query]
-        if val is not None:
-            lat, lng = val.get("lat"), val.get("lng")
-            return (float(lat), float(lng)) if lat and lng else (None, None)
-        if skip_api:
+        if skip_api or not fallbacks:
             return None, None
-        if fallbacks:
-            for fallback in _fallback_queries(query):
-                lat, lng = _fetch_nominatim(fallback, cc)
-                if lat and lng:
-                    cache[query] = {"lat": lat, "lng": lng}
-                    _save_cache(cache)
-                    return float(lat), float(lng)
-        return None, None
+        tried = list(cache[query]["tried"]) if cache[query] is not None else []
+        if all(fallback in tried for fallback in _fallback_queries(query)):
+            return None, None
+        return _geocode_fallbacks(query, cc, tried)
 
     if skip_api:
         return None, None
 
     lat, lng = _fetch_nominatim(query, cc)
     if lat and lng:
-        cache = _load_cache()
-        cache[query] = {"lat": lat, "lng": lng}
-        _save_cache(cache)
+        _store(query, {"lat": lat, "lng": lng})
         return float(lat), float(lng)
 
     if fallbacks:
-        for fallback in _fallback_queries(query):
-            lat, lng = _fetch_nominatim(fallback, cc)
-            if lat and lng:
-                cache = _load_cache()
-                cache[query] = {"lat": lat, "lng": lng}
-                _save_cache(cache)
-                return float(lat), float(lng)
+        return _geocode_fallbacks(query, cc, [])
 
-    cache = _load_cache()
-    cache[query] = None
-    _save_cache(cache)
+    _store(query, {"tried": []})
     return None, None
 
 
+@functools.lru_cache(maxsize=100_000)
 def normalize_location(location: str) -> str:
     """Normalize event location string for geocoding (replace newlines, strip)."""
     if not location or not str(location).strip():
@@ -240,6 +420,17 @@ EVENT_VENUE_PREFIXES = (
     r"[\s\-]*(?:Meet point|PK MARULIANUS|VK Gusar)[\s:]*",
     r"\([^)]*\)",  # remove parentheticals like "(ispod tribine)"
 )
+EVENT_VENUE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in EVENT_VENUE_PREFIXES)
+# All prefixes in one alternation: a single scan tells whether any cleanup applies at all
+EVENT_VENUE_ANY = re.compile("|".join(f"(?:{p})" for p in EVENT_VENUE_PREFIXES), re.IGNORECASE)
+
+# Patterns used by event_location_fallbacks, compiled once
+DASH_SEPARATOR = re.compile(r"\s+-\s+")
+CVITE_FISKOVICA = re.compile(r"\b[Cc]vite Fiskovića\b")
+CVITE_FISKOVICA_NUMBER = re.compile(r"(Cvite Fiskovića\s*\d*)", re.I)
+STUDENTSKOG_DOMA = re.compile(r"studentskog doma\s+([^,\-]+)", re.I)
+MEDITERANSKIH_IGARA = re.compile(r"([IVX]+\.?\s*)?Osmih?\s*mediteranskih\s+igara\s*(\d+)", re.I)
+PLANCICEVA_NUMBER = re.compile(r"Plančićeva\s+(?:ul\.?\s*)?(\d+)", re.I)
 KNOWN_SPLIT_PLACES = ("Split", "Pujanke", "Spinut", "Poljud", "Žnjan", "Kampus")
 GENERIC_WORDS_BLOCKLIST = frozenset(
     {"dvorana", "teren", "kampus", "split", "dvorane", "škola", "dom", "ispred"}
@@ -247,6 +438,7 @@ GENERIC_WORDS_BLOCKLIST = frozenset(
 EVENT_PART_BLOCKLIST = frozenset(
     {"velika dvorana", "mala dvorana", "velika dvorana - kampus", "velika dvorana - studentski dom kampus"}
 )
+DVORANA_PREFIXES = ("velika dvorana", "mala dvorana")
 
 
 def event_location_fallbacks(location: str, country_code: str = "HR") -> list[str]:
@@ -260,6 +452,7 @@ def event_location_fallbacks(location: str, country_code: str = "HR") -> list[st
     country = COUNTRY_NAMES.get(country_code, "Croatia")
     if loc.endswith(f", {country}"):
         loc = loc[: -len(country) - 2].strip()
+    loc_lower = loc.lower()
     fallbacks = []
     seen: set[str] = set()
 
@@ -281,14 +474,12 @@ def event_location_fallbacks(location: str, country_code: str = "HR") -> list[st
         else:
             add(f"{q}, Split")
 
-    parts_by_dash = [p.strip() for p in re.split(r"\s+-\s+", loc, maxsplit=2)]
+    parts_by_dash = [p.strip() for p in DASH_SEPARATOR.split(loc, maxsplit=2)]
     for part in parts_by_dash:
         if not part or len(part) < 3:
             continue
         part_lower = part.lower()
-        if part_lower in EVENT_PART_BLOCKLIST or any(
-            part_lower.startswith(p) for p in ("velika dvorana", "mala dvorana")
-        ):
+        if part_lower in EVENT_PART_BLOCKLIST or part_lower.startswith(DVORANA_PREFIXES):
             add("Studentski dom Kampus, Split")
             add("Cvite Fiskovića 3, Split")
             continue
@@ -309,8 +500,10 @@ def event_location_fallbacks(location: str, country_code: str = "HR") -> list[st
             add_with_split(suffix)
 
     cleaned = loc
-    for pat in EVENT_VENUE_PREFIXES:
-        cleaned = re.sub(pat, " ", cleaned, flags=re.IGNORECASE)
+    # Subs stay sequential when something matches: later patterns may absorb the space an earlier one left
+    if EVENT_VENUE_ANY.search(loc):
+        for pat in EVENT_VENUE_PATTERNS:
+            cleaned = pat.sub(" ", cleaned)
     cleaned = " ".join(cleaned.split())
     if cleaned and cleaned != loc and len(cleaned) > 3:
         add_with_split(cleaned)
@@ -324,25 +517,26 @@ def event_location_fallbacks(location: str, country_code: str = "HR") -> list[st
         if place in loc and place != "Split":
             add_with_split(place)
 
-    if re.search(r"\b[Cc]vite Fiskovića\b", loc):
-        m = re.search(r"(Cvite Fiskovića\s*\d*)", loc, re.I)
+    # Cheap substring gates in front of the regexes; most locations contain none of these
+    if "vite Fiskovića" in loc and CVITE_FISKOVICA.search(loc):
+        m = CVITE_FISKOVICA_NUMBER.search(loc)
         if m:
             add(f"{m.group(1).strip()}, Split")
         add("Cvite Fiskovića 3, Split")
 
-    if "studentskog doma" in loc.lower():
-        m = re.search(r"studentskog doma\s+([^,\-]+)", loc, re.I)
+    if "studentskog doma" in loc_lower:
+        m = STUDENTSKOG_DOMA.search(loc)
         if m:
             add(f"Studentski dom {m.group(1).strip()}, Split")
 
-    if "Osmih mediteranskih" in loc or "mediteranskih igara" in loc.lower():
-        m = re.search(r"([IVX]+\.?\s*)?Osmih?\s*mediteranskih\s+igara\s*(\d+)", loc, re.I)
+    if "Osmih mediteranskih" in loc or "mediteranskih igara" in loc_lower:
+        m = MEDITERANSKIH_IGARA.search(loc)
         if m:
             add(f"Osmih mediteranskih igara {m.group(2)}, Split")
         add("Osmih mediteranskih igara 21, Split")
 
-    if re.search(r"Plančićeva", loc, re.I):
-        m = re.search(r"Plančićeva\s+(?:ul\.?\s*)?(\d+)", loc, re.I)
+    if "plančićeva" in loc_lower:
+        m = PLANCICEVA_NUMBER.search(loc)
         if m:
             add(f"Plančićeva {m.group(1)}, Split")
 
@@ -351,7 +545,7 @@ def event_location_fallbacks(location: str, country_code: str = "HR") -> list[st
 
     add("Split, Croatia")
 
-    return [q for q in fallbacks if not re.match(r"^Split, Split, Croatia$", q)]
+    return [q for q in fallbacks if q != "Split, Split, Croatia"]
 
 
 def geocode_event_location(
@@ -383,9 +577,7 @@ def geocode_event_location(
         result = geocode_address(fallback, country_code, skip_api=False, fallbacks=False)
         if result[0] is not None and result[1] is not None:
             if orig_key:
-                cache = _load_cache()
-                cache[orig_key] = {"lat": result[0], "lng": result[1]}
-                _save_cache(cache)
+                _store(orig_key, {"lat": result[0], "lng": result[1]})
             return result
 
     return None, None
@@ -400,40 +592,51 @@ def add_lat_lng_for_column(
     use_event_fallbacks: bool = False,
 ) -> "pd.DataFrame":
     """Add lat, lng columns from geocoding the given address column. Returns new DataFrame."""
+    import numpy as np
     import pandas as pd
 
-    unique_addrs = df[column].dropna().apply(normalize_location).unique()
-    unique_addrs = [a for a in unique_addrs if a]
+    # Normalize and build the cache key once per distinct value; rows then gather by factorize code.
+    codes, values = pd.factorize(df[column])
+    addrs = [normalize_location(v) for v in values]
+    keys = [build_query(addr, country_code) if addr else None for addr in addrs]
 
     def do_geocode(addr):
         if use_event_fallbacks:
             return geocode_event_location(addr, country_code, skip_api=skip_api)
         return geocode_address(addr, country_code, skip_api=skip_api, fallbacks=True)
 
-    coords = {}
-    for addr in unique_addrs:
-        key = build_query(addr, country_code)
-        if key and key not in coords:
-            coords[key] = do_geocode(addr)
+    by_key = {}
+    for key, addr in zip(keys, addrs):
+        if key and key not in by_key:
+            by_key[key] = addr
 
-    def get_lat_lng(val):
-        addr = normalize_location(val) if pd.notna(val) else ""
-        if not addr:
-            return None, None
-        key = build_query(addr, country_code)
-        return coords.get(key, (None, None))
+    # Cache hits straight from the dict; only the rest go through geocoding (and the API unless skip_api).
+    cache = _load_cache()
+    hits = {key: _cached_hit(cache, CACHE_QUERY_CORRECTIONS.get(key, key)) for key in by_key}
+    pending = [key for key, hit in hits.items() if hit is None or hit[0] is None]
+    if skip_api:
+        found = [(None, None)] * len(pending)
+    elif _geocode_workers() > 1:
+        with ThreadPoolExecutor(max_workers=_geocode_workers()) as pool:
+            found = list(pool.map(do_geocode, [by_key[key] for key in pending]))
+    else:
+        found = [do_geocode(by_key[key]) for key in pending]
+    hits.update(zip(pending, found))
+    results = [hits[key] for key in by_key]
 
     def to_float(v):
         if v is None:
-            return None
+            return np.nan
         try:
             return float(v)
         except (ValueError, TypeError):
-            return None
-
-    lat_lng = df[column].apply(get_lat_lng)
-    out = df.copy()
-    out["lat"] = lat_lng.apply(lambda x: to_float(x[0]))
-    out["lng"] = lat_lng.apply(lambda x: to_float(x[1]))
-    return out
+            return np.nan
+
+    coords = {key: (to_float(lat), to_float(lng)) for key, (lat, lng) in zip(by_key, results)}
+    missing = (np.nan, np.nan)
+    # Extra trailing entry: missing values have code -1 and land on it.
+    table = np.array([coords.get(key, missing) for key in keys] + [missing], dtype=np.float64).reshape(-1, 2)
+    lat_lng = table[codes]
+    flush_cache()
+    return df.assign(lat=lat_lng[:, 0], lng=lat_lng[:, 1])
 
@@ -3,9 +3,63 @@ Compute geographic proximity (susjedstvo) between attendees at events.
 Uses residence lat/lng to detect "neighbors" — attendees who live within radius_km of each other.
 """
 
+import numpy as np
 import pandas as pd
 
-from utils.distance import distance_km
+from utils.distance import EARTH_RADIUS_KM
+
+# Events up to this many located attendees are handled together through a self-join of
+# attendee pairs; larger ones get a BallTree radius query each (pairs grow as N^2)
+PAIRWISE_MAX_ATTENDEES = 300
+# Self-join pairs are built for batches of consecutive events of about this many pairs, so memory
+# stays bounded (tens of MB per array) however many events there are
+PAIRWISE_BATCH_PAIRS = 5_000_000
+
+
+def _within_radius(
+    phi1: np.ndarray, lam1: np.ndarray, cos1: np.ndarray,
+    phi2: np.ndarray, lam2: np.ndarray, cos2: np.ndarray,
+    radius_km: float,
+) -> np.ndarray:
+    """
+    distance_km_vec(...) <= radius_km for points in radians with their cos(lat) precomputed.
+    Haversine is monotonic in a = sin²(dφ/2) + cos φ1 cos φ2 sin²(dλ/2), so a is compared
+    against sin²(radius / 2R) instead of taking arcsin/sqrt per pair.
+    """
+    half_angle = radius_km / (2 * EARTH_RADIUS_KM)
+    if half_angle >= np.pi / 2:
+        return np.ones(np.broadcast(phi1, phi2).shape, dtype=bool)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + cos1 * cos2 * np.sin((lam2 - lam1) / 2) ** 2
+    return a <= np.sin(half_angle) ** 2
+
+
+def _pairwise_neighbors(
+    starts: np.ndarray, sizes: np.ndarray,
+    phi: np.ndarray, lam: np.ndarray, cos_phi: np.ndarray,
+    radius_km: float,
+) -> np.ndarray:
+    """
+    Self-join within runs (events) given by starts/sizes: every (attendee, other attendee) pair.
+    Returns positions of attendees with another attendee of their run within radius_km (may repeat).
+    """
+    start = np.repeat(starts, sizes)
+    size = np.repeat(sizes, sizes)
+    member = start + np.arange(len(start)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    x = np.repeat(member, size)
+    offset_in_run = np.arange(len(x)) - np.repeat(np.cumsum(size) - size, size)
+    y = np.repeat(start, size) + offset_in_run
+    within = (x != y) & _within_radius(phi[x], lam[x], cos_phi[x], phi[y], lam[y], cos_phi[y], radius_km)
+    return x[within]
+
+
+def _ball_tree_has_neighbor(lat: np.ndarray, lng: np.ndarray, radius_km: float) -> np.ndarray:
+    """For each point (degrees): is any other point within radius_km?"""
+    from sklearn.neighbors import BallTree
+
+    points = np.radians(np.column_stack([lat, lng]))
+    tree = BallTree(points, metric="haversine")
+    # Every point finds itself, so a neighbor means a count of at least two.
+    return tree.query_radius(points, r=radius_km / EARTH_RADIUS_KM, count_only=True) > 1
 
 
 def had_neighbor_per_attendance(
@@ -27,28 +81,44 @@ def had_neighbor_per_attendance(
     Returns:
         DataFrame with event_col, user_col, 'had_neighbor' (bool).
     """
-    coords = people_lat_lng.dropna(subset=["lat", "lng"]).set_index(user_col)[["lat", "lng"]]
-    results = []
-
-    for eid, grp in df_attended.groupby(event_col):
-        attendees = grp[user_col].unique().tolist()
-        for uid in attendees:
-            if uid not in coords.index:
-                results.append({event_col: eid, user_col: uid, "had_neighbor": False})
-                continue
-            my = coords.loc[uid]
-            my_lat, my_lng = float(my["lat"]), float(my["lng"])
-            had = False
-            for oid in attendees:
-                if oid == uid:
-                    continue
-                if oid not in coords.index:
-                    continue
-                other = coords.loc[oid]
-                d = distance_km((my_lat, my_lng), (float(other["lat"]), float(other["lng"])))
-                if d <= radius_km:
-                    had = True
-                    break
-            results.append({event_col: eid, user_col: uid, "had_neighbor": had})
-
-    return pd.DataFrame(results)
+    # Residence coordinates as parallel arrays; user ids resolve to positions in one hash lookup.
+    located = people_lat_lng.dropna(subset=["lat", "lng"]).drop_duplicates(subset=[user_col])
+    uids = pd.Index(located[user_col].to_numpy())
+    lats = located["lat"].to_numpy(dtype=np.float64)
+    lngs = located["lng"].to_numpy(dtype=np.float64)
+    # One row per (event, attendee), events in sorted order, attendees in order of appearance.
+    att = (
+        df_attended[[event_col, user_col]]
+        .dropna(subset=[event_col])
+        .drop_duplicates()
+        .sort_values(event_col, kind="stable")
+        .reset_index(drop=True)
+    )
+    had = np.zeros(len(att), dtype=bool)
+
+    pos = uids.get_indexer(att[user_col])
+    rows = np.flatnonzero(pos >= 0)
+    lat = lats[pos[rows]]
+    lng = lngs[pos[rows]]
+    # att is sorted by event, so each event's located attendees are one contiguous run.
+    codes = pd.factorize(att[event_col].to_numpy()[rows])[0]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    sizes = np.diff(np.r_[starts, len(rows)])
+
+    # Trig inputs once per attendee; pairs only gather them.
+    phi, lam = np.radians(lat), np.radians(lng)
+    cos_phi = np.cos(phi)
+    small = (sizes > 1) & (sizes <= PAIRWISE_MAX_ATTENDEES)
+    small_starts, small_sizes = starts[small], sizes[small]
+    # Consecutive small events grouped by running pair count (n² each), one self-join per group
+    batch = np.cumsum(small_sizes.astype(np.int64) ** 2) // PAIRWISE_BATCH_PAIRS
+    cuts = np.r_[0, np.flatnonzero(np.diff(batch)) + 1, len(batch)]
+    for lo, hi in zip(cuts[:-1], cuts[1:]):
+        hit = _pairwise_neighbors(small_starts[lo:hi], small_sizes[lo:hi], phi, lam, cos_phi, radius_km)
+        had[rows[hit]] = True
+
+    for s0, n in zip(starts[sizes > PAIRWISE_MAX_ATTENDEES], sizes[sizes > PAIRWISE_MAX_ATTENDEES]):
+        run = slice(s0, s0 + n)
+        had[rows[run]] = _ball_tree_has_neighbor(lat[run], lng[run], radius_km)
+
+    return att.assign(had_neighbor=had)
@@ -2,6 +2,8 @@
 Map reservation status codes to Croatian labels.
 """
 
+import pandas as pd
+
 # ReservationStatus enum values from Breeze DB
 RESERVATION_STATUS_LABELS: dict[int, str] = {
     -2: "Nepoznato",
@@ -22,5 +24,12 @@ def reservation_status_label(status: int) -> str:
 
     Returns:
         Croatian label for the status, or "Nepoznato" for unknown codes.
+
+    For a whole DataFrame column use reservation_status_labels instead of .apply.
     """
     return RESERVATION_STATUS_LABELS.get(status, "Nepoznato")
+
+
+def reservation_status_labels(status: pd.Series) -> pd.Series:
+    """Vectorized reservation_status_label for a column; unknown or missing codes become "Nepoznato"."""
+    return status.map(RESERVATION_STATUS_LABELS).fillna("Nepoznato")